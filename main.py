@@ -1,21 +1,270 @@
 from fastapi import FastAPI, HTTPException, Body, Request
-from pydantic import BaseModel
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict
+import orjson
 import dspy
 from dspy.evaluate import answer_exact_match
 from dspy.utils.dummies import DummyLM
-from typing import Dict, Any, List, Optional, Type
+from typing import Dict, Any, List, Optional, Tuple, Type
 from itertools import cycle
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import json
+import logging
+import logging.handlers
 import os
+import queue
+import threading
+import time
+import uuid
+import cachetools
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="DSPy Proxy Server")
+logger = logging.getLogger("dspy_proxy")
+
+class RateLimitFilter(logging.Filter):
+    """Caps records per second so failure storms (e.g. provider 429s)
+    don't amplify into a wall of synchronously formatted tracebacks."""
+    def __init__(self, per_second: int):
+        super().__init__()
+        self.per_second = per_second
+        self._window = 0
+        self._count = 0
+
+    def filter(self, record):
+        now = int(time.time())
+        if now != self._window:
+            self._window = now
+            self._count = 0
+        self._count += 1
+        return self._count <= self.per_second
+
+def setup_logging():
+    """Route records through a queue so handler I/O happens on a
+    background thread, not in the request path."""
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(int(os.environ.get("ERROR_LOG_PER_SECOND", 5))))
+    logger.addHandler(queue_handler)
+    logger.setLevel(logging.INFO)
+
+setup_logging()
+
+# orjson (Rust) serializes responses several times faster than stdlib json;
+# matters most for /predict responses carrying long CoT rationales
+app = FastAPI(title="DSPy Proxy Server", default_response_class=ORJSONResponse)
+
+# Default LM-call parallelism for optimize/evaluate; deployers can cap it
+# to match provider rate limits
+DEFAULT_NUM_THREADS = int(os.environ.get("DSPY_NUM_THREADS", 16))
+
+# dspy pins settings.configure to the first calling thread, so it runs
+# exactly once here on the main thread at import. Per-request LMs are
+# applied with dspy.context instead of reconfiguring the global.
+dspy.settings.configure(async_max_workers=int(os.environ.get("ASYNC_MAX_WORKERS", 8)))
+
+# Dedicated pool for long-running compiles, so concurrent /optimize jobs
+# can't starve the default executor that serves /predict and sync handlers
+OPTIMIZE_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.environ.get("OPTIMIZE_POOL_WORKERS", 2)),
+    thread_name_prefix="optimize",
+)
+
+def exact_match_metric(example, pred, trace=None):
+    return answer_exact_match(example, pred)
+
+# Named metrics resolved on /optimize and /evaluate; unknown names fall
+# back to the per-signature default metric built at registration
+METRICS: Dict[str, Any] = {"exact_match": exact_match_metric}
+
+class RegisteredSignature:
+    """A signature class plus field metadata precomputed at registration,
+    so the per-request endpoints don't re-scan Pydantic field info."""
+    def __init__(self, sig):
+        self.sig = sig
+        self.input_keys = tuple(k for k, v in sig.fields.items() if v.json_schema_extra['__dspy_field_type'] == 'input')
+        self.output_keys = tuple(k for k, v in sig.fields.items() if v.json_schema_extra['__dspy_field_type'] == 'output')
+        # Default metric: simple equality of the last output field
+        output_field = self.output_keys[-1]
+        def default_metric(example, pred, trace=None):
+            return getattr(example, output_field) == getattr(pred, output_field)
+        self.default_metric = default_metric
+
+# Guards the shared stores below (signatures, module caches, LM registry
+# and default). Sync handlers run in Starlette's threadpool while async
+# ones share the event loop, so a threading.Lock covers both; the critical
+# sections are tiny and never do I/O. Global dspy settings are not written
+# under this lock — they are configured once at import and never mutated.
+_state_lock = threading.Lock()
 
 # In-memory storage
-signatures: Dict[str, Any] = {} # Stores Signature classes
-compiled_modules: Dict[str, Any] = {} # Store optimized modules
+signatures: Dict[str, RegisteredSignature] = {} # Stores registered signatures
+# Configured LMs keyed by "provider/model"; requests can pick one via
+# lm_key or fall back to the default set by the most recent /configure
+lms: Dict[str, Any] = {}
+default_lm: Optional[Any] = None
+# Optimized modules carry demos and traces that can run to MBs each, so
+# bound the store and evict least-recently-used entries
+compiled_modules: cachetools.LRUCache = cachetools.LRUCache(
+    maxsize=int(os.environ.get("MAX_COMPILED_MODULES", 128))
+)
+
+# Marks "field absent on the prediction" without hasattr's exception path
+_SENTINEL = object()
+
+# Module dispatch table (avoids if/elif chains on the hot path)
+MODULE_CLASSES: Dict[str, Any] = {
+    "Predict": dspy.Predict,
+    "ChainOfThought": dspy.ChainOfThought,
+    "ProgramOfThought": dspy.ProgramOfThought,
+}
+
+# Zero-shot module instances, memoized so /predict doesn't rebuild the
+# module graph on every call
+_module_cache: Dict[Tuple[str, str], Any] = {}
+
+# Deterministic response cache: temperature-0 calls with identical inputs
+# always produce the same output, so repeats skip the LM round-trip entirely
+response_cache: cachetools.TTLCache = cachetools.TTLCache(
+    maxsize=int(os.environ.get("RESPONSE_CACHE_SIZE", 10_000)),
+    ttl=int(os.environ.get("RESPONSE_CACHE_TTL", 3600)),
+)
+
+def response_cache_key(model_name: str, req: "PredictRequest", entry: "RegisteredSignature") -> str:
+    # Key on the schema content, not just the name, so re-registering a
+    # name with a different signature can't serve stale entries
+    payload = json.dumps({
+        "model": model_name,
+        "sig": req.signature_name,
+        "schema": entry.sig.signature,
+        "instr": entry.sig.instructions,
+        "inputs": req.inputs,
+        "mtype": req.module_type,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+# Optional semantic cache: catches paraphrased inputs that miss the exact
+# cache. Off by default; enabling it requires sentence-transformers.
+SEMANTIC_CACHE_ENABLED = os.environ.get("SEMANTIC_CACHE", "").lower() in ("1", "true", "yes")
+
+_embedder = None
+
+def get_embedder():
+    global _embedder
+    if _embedder is None:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise RuntimeError("SEMANTIC_CACHE=1 requires the sentence-transformers package")
+        _embedder = SentenceTransformer(
+            os.environ.get("SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+        )
+    return _embedder
+
+class SemanticCache:
+    """Flat cosine-similarity cache over input embeddings. Entries are
+    namespaced by (model, signature, module type) so hits never cross
+    contexts, and the store is a bounded FIFO scanned brute-force."""
+    def __init__(self, maxsize: int, threshold: float):
+        self.threshold = threshold
+        self._entries = collections.deque(maxlen=maxsize)
+        self._lock = threading.Lock()
+
+    def get(self, namespace, text):
+        """Embed text and return (vector, best cached output or None)."""
+        vec = get_embedder().encode(text, normalize_embeddings=True)
+        best_output = None
+        best_sim = self.threshold
+        with self._lock:
+            for ns, v, output in self._entries:
+                if ns != namespace:
+                    continue
+                sim = float(v @ vec)
+                if sim >= best_sim:
+                    best_sim = sim
+                    best_output = output
+        return vec, best_output
+
+    def put(self, namespace, vec, output):
+        with self._lock:
+            self._entries.append((namespace, vec, output))
+
+semantic_cache = SemanticCache(
+    maxsize=int(os.environ.get("SEMANTIC_CACHE_SIZE", 2048)),
+    threshold=float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", 0.97)),
+)
+
+def build_examples(rows: List[Dict[str, Any]], input_keys: Tuple[str, ...]) -> List[Any]:
+    """Construct dspy Examples in a single pass, setting the input keys in
+    place rather than via with_inputs(), which copies every example."""
+    input_key_set = set(input_keys)
+    examples = []
+    for row in rows:
+        ex = dspy.Example(**row)
+        ex._input_keys = input_key_set
+        examples.append(ex)
+    return examples
+
+def prediction_to_dict(result, entry: RegisteredSignature) -> Dict[str, Any]:
+    output = {k: v for k in entry.output_keys if (v := getattr(result, k, _SENTINEL)) is not _SENTINEL}
+    # Also capture rationale if CoT
+    rationale = getattr(result, "rationale", _SENTINEL)
+    if rationale is not _SENTINEL:
+        output["rationale"] = rationale
+    return output
+
+def sse_event(chunk, entry: RegisteredSignature) -> bytes:
+    """Format one streamify chunk as a Server-Sent Event."""
+    if isinstance(chunk, dspy.Prediction):
+        payload = {"type": "prediction", "data": prediction_to_dict(chunk, entry)}
+    elif hasattr(chunk, "model_dump"):
+        payload = {"type": "chunk", "data": chunk.model_dump()}
+    else:
+        payload = {"type": "chunk", "data": str(chunk)}
+    return b"data: " + orjson.dumps(payload, default=str) + b"\n\n"
+
+def set_default_lm(key: str, lm) -> None:
+    """Record a configured LM and make it the default for requests that
+    don't pass an lm_key."""
+    global default_lm
+    with _state_lock:
+        lms[key] = lm
+        default_lm = lm
+
+def resolve_lm(lm_key: Optional[str]):
+    """Pick the LM for a request: an explicit lm_key beats the default from
+    the most recent /configure. Never touches dspy.settings."""
+    if lm_key:
+        lm = lms.get(lm_key)
+        if lm is None:
+            raise HTTPException(status_code=404, detail=f"LM '{lm_key}' not configured")
+        return lm
+    if default_lm is None:
+        raise HTTPException(status_code=400, detail="No LM configured. Call /configure first.")
+    return default_lm
+
+def get_module(signature_name: str, module_type: str):
+    key = (signature_name, module_type)
+    with _state_lock:
+        module = _module_cache.get(key)
+        if module is None:
+            cls = MODULE_CLASSES.get(module_type)
+            if cls is None:
+                raise HTTPException(status_code=400, detail=f"Unknown module type: {module_type}")
+            module = cls(signatures[signature_name].sig)
+            _module_cache[key] = module
+    return module
 
 class RegisterRequest(BaseModel):
     name: str
@@ -36,6 +285,8 @@ class PredictRequest(BaseModel):
     inputs: Dict[str, Any]
     module_type: str = "Predict"  # Predict, ChainOfThought, ProgramOfThought, etc.
     compiled_module_id: Optional[str] = None # If using a previously optimized module
+    stream: bool = False # Stream tokens via Server-Sent Events instead of one JSON blob
+    lm_key: Optional[str] = None # Use a specific configured LM (key returned by /configure)
 
 class OptimizeRequest(BaseModel):
     signature_name: str
@@ -46,12 +297,13 @@ class OptimizeRequest(BaseModel):
     # Additional optimizer params
     num_candidates: int = 7 # For COPRO
     init_temperature: float = 1.4 # For COPRO
-    num_threads: int = 1 # For COPRO/MIPROv2
+    num_threads: int = DEFAULT_NUM_THREADS # Parallel LM calls (COPRO/MIPROv2)
     minibatch: bool = False # For MIPROv2
     minibatch_size: int = 16 # For MIPROv2
     minibatch_full_eval_steps: int = 10 # For MIPROv2
     prompt_model: Optional[str] = None # For MIPROv2/COPRO (if different from task model)
     prompt_model_provider: Optional[str] = None # For MIPROv2/COPRO
+    lm_key: Optional[str] = None # Use a specific configured LM (key returned by /configure)
 
 class EvaluateRequest(BaseModel):
     signature_name: str
@@ -59,8 +311,37 @@ class EvaluateRequest(BaseModel):
     metric: str = "exact_match"
     compiled_module_id: Optional[str] = None
     module_type: str = "Predict"
-    num_threads: int = 1
+    num_threads: int = DEFAULT_NUM_THREADS # Parallel LM calls for scoring
     display_progress: bool = False
+    lm_key: Optional[str] = None # Use a specific configured LM (key returned by /configure)
+
+# Response models let FastAPI serialize through pydantic-core's Rust fast
+# path instead of the generic jsonable_encoder walk. Predict outputs are
+# signature-defined, so that model is all extra fields.
+class PredictResponse(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+class RegisterResponse(BaseModel):
+    status: str
+    name: str
+    fields: List[str]
+
+class OptimizeResponse(BaseModel):
+    status: str
+    module_id: str
+
+class EvaluateResponse(BaseModel):
+    status: str
+    score: Any
+
+def warm_lm(lm):
+    """Prime the provider connection with a 1-token call so the first real
+    /predict doesn't pay the TCP/TLS handshake. Best-effort: failures here
+    surface on first use anyway."""
+    try:
+        lm("ping", max_tokens=1)
+    except Exception:
+        pass
 
 @app.post("/configure")
 def configure_lm(req: ConfigureRequest):
@@ -68,9 +349,8 @@ def configure_lm(req: ConfigureRequest):
         # Simple dummy that returns a fixed response or rotates through a list
         # ChainOfThought expects 'reasoning' field usually
         # Multiply list to simulate infinite responses for testing
-        lm = DummyLM([{"answer": "42", "reasoning": "because"}] * 1000)
-        dspy.settings.configure(lm=lm)
-        return {"status": "configured", "model": "dummy"}
+        set_default_lm("dummy", DummyLM([{"answer": "42", "reasoning": "because"}] * 1000))
+        return {"status": "configured", "model": "dummy", "lm_key": "dummy"}
 
     # Determine API Key
     api_key = req.api_key
@@ -119,18 +399,30 @@ def configure_lm(req: ConfigureRequest):
             api_version = os.environ.get("AZURE_API_VERSION")
 
         lm = dspy.LM(model=model_name, api_key=api_key, max_tokens=req.max_tokens, temperature=req.temperature, api_base=api_base, api_version=api_version)
-        dspy.settings.configure(lm=lm)
+        set_default_lm(model_name, lm)
+        # Warm the connection in the background; don't block the configure response
+        threading.Thread(target=warm_lm, args=(lm,), daemon=True).start()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to configure LM: {str(e)}")
-    
-    return {"status": "configured", "model": model_name, "provider": req.provider}
 
-@app.post("/register")
+    return {"status": "configured", "model": model_name, "provider": req.provider, "lm_key": model_name}
+
+@functools.lru_cache(maxsize=256)
+def make_sig(sig_str: str, instructions: str):
+    """Memoized dspy.make_signature: signature classes are immutable values,
+    so retrying clients re-registering the same pair reuse one class."""
+    return dspy.make_signature(sig_str, instructions=instructions)
+
+@app.post("/register", response_model=RegisterResponse, response_model_exclude_unset=True)
 def register_signature(req: RegisterRequest):
     try:
         # Create a dynamic signature class
-        sig = dspy.make_signature(req.signature, instructions=req.instructions or "")
-        signatures[req.name] = sig
+        sig = make_sig(req.signature, req.instructions or "")
+        with _state_lock:
+            signatures[req.name] = RegisteredSignature(sig)
+            # Drop memoized modules built against a previous schema for this name
+            for key in [k for k in _module_cache if k[0] == req.name]:
+                del _module_cache[key]
         return {
             "status": "registered", 
             "name": req.name, 
@@ -139,73 +431,87 @@ def register_signature(req: RegisterRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/predict")
-def predict(req: PredictRequest):
+@app.post("/predict", response_model=PredictResponse, response_model_exclude_unset=True)
+async def predict(req: PredictRequest):
     if req.signature_name not in signatures:
         raise HTTPException(status_code=404, detail=f"Signature '{req.signature_name}' not found")
     
-    sig = signatures[req.signature_name]
-    
+    entry = signatures[req.signature_name]
+
+    # The whole request runs against this LM via dspy.context, so
+    # concurrent tenants on different models never trample each other
+    lm = resolve_lm(req.lm_key)
+
+    # Serve deterministic repeats from cache (zero-shot, temperature 0 only)
+    cache_key = None
+    sem_ns = sem_vec = None
+    if not req.stream and not req.compiled_module_id and lm.kwargs.get("temperature", 0) == 0:
+        lm_name = req.lm_key or getattr(lm, "model", "unknown")
+        cache_key = response_cache_key(lm_name, req, entry)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        # Exact miss: try the (optional) semantic cache for paraphrased inputs.
+        # The namespace carries the schema content so entries die with it
+        # when a name is re-registered under a different signature
+        if SEMANTIC_CACHE_ENABLED:
+            sem_ns = (lm_name, req.signature_name, entry.sig.signature, entry.sig.instructions, req.module_type)
+            sem_text = json.dumps(req.inputs, sort_keys=True)
+            sem_vec, sem_hit = await asyncio.to_thread(semantic_cache.get, sem_ns, sem_text)
+            if sem_hit is not None:
+                return sem_hit
+
+    # Resolve the module outside the try so its 400/404s aren't re-raised
+    # as 500s by the generic handler (mirrors /evaluate)
+    if req.compiled_module_id:
+        if req.compiled_module_id not in compiled_modules:
+            raise HTTPException(status_code=404, detail="Compiled module not found")
+        module = compiled_modules[req.compiled_module_id]
+    else:
+        module = get_module(req.signature_name, req.module_type)
+
     try:
-        # If a compiled module is requested
-        if req.compiled_module_id:
-            if req.compiled_module_id not in compiled_modules:
-                raise HTTPException(status_code=404, detail="Compiled module not found")
-            module = compiled_modules[req.compiled_module_id]
-        else:
-            # Instantiate fresh module
-            if req.module_type == "Predict":
-                module = dspy.Predict(sig)
-            elif req.module_type == "ChainOfThought":
-                module = dspy.ChainOfThought(sig)
-            elif req.module_type == "ProgramOfThought":
-                module = dspy.ProgramOfThought(sig)
-            else:
-                raise HTTPException(status_code=400, detail=f"Unknown module type: {req.module_type}")
-        
-        # Execute
-        result = module(**req.inputs)
-        
-        # Convert Prediction to dict
-        output = {}
-        for key in sig.fields:
-            if hasattr(result, key):
-                output[key] = getattr(result, key)
+        # Stream tokens as they arrive instead of buffering the full generation
+        if req.stream:
+            async def event_stream():
+                with dspy.context(lm=lm):
+                    async for chunk in dspy.streamify(module)(**req.inputs):
+                        yield sse_event(chunk, entry)
+
+            return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+        # Execute without blocking the event loop (LLM round-trips are I/O-bound)
+        with dspy.context(lm=lm):
+            result = await dspy.asyncify(module)(**req.inputs)
         
-        # Also capture rationale if CoT
-        if hasattr(result, "rationale"):
-            output["rationale"] = result.rationale
+        # Convert Prediction to dict (output fields were precomputed at registration)
+        output = prediction_to_dict(result, entry)
+
+        if cache_key is not None:
+            response_cache[cache_key] = output
+            if sem_vec is not None:
+                semantic_cache.put(sem_ns, sem_vec, output)
 
         return output
-        
+
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("predict failed for signature %s", req.signature_name)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/optimize")
-def optimize(req: OptimizeRequest):
+@app.post("/optimize", response_model=OptimizeResponse, response_model_exclude_unset=True)
+async def optimize(req: OptimizeRequest):
     if req.signature_name not in signatures:
         raise HTTPException(status_code=404, detail="Signature not found")
     
-    sig = signatures[req.signature_name]
-    
-    # Prepare Data
-    # Identify input keys from signature
-    input_keys = [k for k, v in sig.fields.items() if v.json_schema_extra['__dspy_field_type'] == 'input']
-    
-    trainset = [dspy.Example(**x).with_inputs(*input_keys) for x in req.train_data]
-    
-    # Define Metric
-    if req.metric == "exact_match":
-        def optimize_metric_fn(example, pred, trace=None):
-            return answer_exact_match(example, pred)
-    else:
-        # Default to simple equality of the last output field
-        output_keys = [k for k, v in sig.fields.items() if v.json_schema_extra['__dspy_field_type'] == 'output']
-        output_field = output_keys[-1]
-        def optimize_metric_fn(example, pred, trace=None):
-            return getattr(example, output_field) == getattr(pred, output_field)
+    entry = signatures[req.signature_name]
+    sig = entry.sig
+    lm = resolve_lm(req.lm_key)
+
+    # Prepare Data (input keys were precomputed at registration)
+    trainset = build_examples(req.train_data, entry.input_keys)
+
+    # Resolve Metric (registry first, then the signature's default)
+    optimize_metric_fn = METRICS.get(req.metric) or entry.default_metric
 
     try:
         # Optimizer
@@ -230,51 +536,55 @@ def optimize(req: OptimizeRequest):
         # Compile
         student = dspy.ChainOfThought(sig)
         
+        # compile() is long-running; run it on the dedicated pool so the event
+        # loop and the default executor serving /predict stay free
         if req.optimizer == "MIPROv2":
-             compiled_program = optimizer.compile(
-                 student, 
-                 trainset=trainset, 
+             compile_fn = functools.partial(
+                 optimizer.compile,
+                 student,
+                 trainset=trainset,
                  minibatch=req.minibatch,
                  minibatch_size=req.minibatch_size,
                  minibatch_full_eval_steps=req.minibatch_full_eval_steps,
                  requires_permission_to_run=False
              )
         elif req.optimizer == "COPRO":
-             compiled_program = optimizer.compile(student, trainset=trainset, eval_kwargs={})
+             compile_fn = functools.partial(optimizer.compile, student, trainset=trainset, eval_kwargs={})
         else:
-             compiled_program = optimizer.compile(student, trainset=trainset)
+             compile_fn = functools.partial(optimizer.compile, student, trainset=trainset)
+
+        def run_compile():
+            # Executor threads don't inherit the request's context, so the
+            # LM override is established inside the worker
+            with dspy.context(lm=lm):
+                return compile_fn()
+
+        compiled_program = await asyncio.get_running_loop().run_in_executor(OPTIMIZE_POOL, run_compile)
         
-        # Store compiled program
-        module_id = f"{req.signature_name}_opt_{len(compiled_modules)}"
-        compiled_modules[module_id] = compiled_program
+        # Store compiled program (uuid suffix stays unique across evictions)
+        module_id = f"{req.signature_name}_opt_{uuid.uuid4().hex[:8]}"
+        with _state_lock:
+            compiled_modules[module_id] = compiled_program
         
         return {"status": "optimized", "module_id": module_id}
-        
+
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("optimize failed for signature %s", req.signature_name)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/evaluate")
-def evaluate(req: EvaluateRequest):
+@app.post("/evaluate", response_model=EvaluateResponse, response_model_exclude_unset=True)
+async def evaluate(req: EvaluateRequest):
     if req.signature_name not in signatures:
         raise HTTPException(status_code=404, detail="Signature not found")
     
-    sig = signatures[req.signature_name]
-    
-    # Prepare Data
-    input_keys = [k for k, v in sig.fields.items() if v.json_schema_extra['__dspy_field_type'] == 'input']
-    testset = [dspy.Example(**x).with_inputs(*input_keys) for x in req.test_data]
-    
-    # Define Metric
-    if req.metric == "exact_match":
-        def eval_metric_fn(example, pred, trace=None):
-            return answer_exact_match(example, pred)
-    else:
-        output_keys = [k for k, v in sig.fields.items() if v.json_schema_extra['__dspy_field_type'] == 'output']
-        output_field = output_keys[-1]
-        def eval_metric_fn(example, pred, trace=None):
-            return getattr(example, output_field) == getattr(pred, output_field)
+    entry = signatures[req.signature_name]
+    lm = resolve_lm(req.lm_key)
+
+    # Prepare Data (input keys were precomputed at registration)
+    testset = build_examples(req.test_data, entry.input_keys)
+
+    # Resolve Metric (registry first, then the signature's default)
+    eval_metric_fn = METRICS.get(req.metric) or entry.default_metric
 
     # Get Module
     if req.compiled_module_id:
@@ -282,22 +592,21 @@ def evaluate(req: EvaluateRequest):
             raise HTTPException(status_code=404, detail="Compiled module not found")
         module = compiled_modules[req.compiled_module_id]
     else:
-        if req.module_type == "Predict":
-            module = dspy.Predict(sig)
-        elif req.module_type == "ChainOfThought":
-            module = dspy.ChainOfThought(sig)
-        elif req.module_type == "ProgramOfThought":
-            module = dspy.ProgramOfThought(sig)
-        else:
-            raise HTTPException(status_code=400, detail=f"Unknown module type: {req.module_type}")
+        module = get_module(req.signature_name, req.module_type)
 
     try:
         evaluator = dspy.Evaluate(devset=testset, metric=eval_metric_fn, num_threads=req.num_threads, display_progress=req.display_progress)
-        score = evaluator(module)
-        return {"status": "evaluated", "score": score}
+
+        def run_eval():
+            # Establish the LM override inside the worker thread
+            with dspy.context(lm=lm):
+                return evaluator(module)
+
+        score = await asyncio.to_thread(run_eval)
+        # EvaluationResult holds dspy objects pydantic can't serialize directly
+        return {"status": "evaluated", "score": jsonable_encoder(score)}
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("evaluate failed for signature %s", req.signature_name)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":